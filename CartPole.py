@@ -1,10 +1,18 @@
 """
 fork from python-rl and pybrain for visualization
 """
-#import numpy as np
-import autograd.numpy as np
+import math
+import numpy as np
 from matplotlib.pyplot import ion, draw, Rectangle, Line2D
 import matplotlib.pyplot as plt
+import scipy.linalg
+from scipy.linalg.blas import get_blas_funcs
+try:
+    from numba import njit
+except ImportError: # numba is optional, without it the integrator just runs as plain python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda func: func
 
 # If theta  has gone past our conceptual limits of [-pi,pi]
 # map it onto the equivalent angle that is in the accepted range (by adding or subtracting 2pi)
@@ -13,11 +21,13 @@ def remap_angle(theta):
     return _remap_angle(theta)
     
 def _remap_angle(theta):
-    while theta < -np.pi:
-        theta += 2. * np.pi
-    while theta > np.pi:
-        theta -= 2. * np.pi
-    return theta
+    if -np.pi <= theta <= np.pi: return theta
+    return np.remainder(theta + np.pi, 2. * np.pi) - np.pi
+
+# same mapping applied to a whole array of angles in one call, angles already in range are left untouched
+def _remap_angle_vec(arr):
+    arr = np.asarray(arr)
+    return np.where(np.abs(arr) <= np.pi, arr, np.remainder(arr + np.pi, 2. * np.pi) - np.pi)
     
 
 ## loss function given a state vector. the elements of the state vector are
@@ -27,6 +37,66 @@ def _remap_angle(theta):
 def loss(state, alpha=[1,1,0.5,0.5]):
     return _loss(state, alpha)
 
+# sin and cos of the pole angle are carried between Euler steps with the sum-angle identities
+# and recomputed exactly every _TRIG_RESYNC_STEPS steps so rounding errors can't build up
+_TRIG_RESYNC_STEPS = 5
+
+@njit(cache=True, fastmath=True)
+def _step_cartpole(state, force, sim_steps, dt, params):
+    """
+    Euler integration of the equations of motion, pulled out of CartPole.performAction
+    so it can be compiled
+
+    Parameters
+    ----------
+    state : np.ndarray
+        [cart_location, cart_velocity, pole_angle, pole_velocity]
+    force : float
+        already limited force applied to the cart
+    sim_steps : int
+        number of Euler integration steps to perform
+    dt : float
+        time step of each Euler integration step
+    params : tuple
+        (cart_mass, pole_mass, pole_length, mu_c, mu_p, gravity)
+
+    Returns
+    -------
+    tuple
+        state after sim_steps integration steps
+    """
+    cart_mass, pole_mass, pole_length, mu_c, mu_p, gravity = params
+    cart_location, cart_velocity, pole_angle, pole_velocity = state[0], state[1], state[2], state[3]
+
+    for step in range(sim_steps):
+        if step % _TRIG_RESYNC_STEPS == 0:
+            s = math.sin(pole_angle)
+            c = math.cos(pole_angle)
+        m = 4.0*(cart_mass+pole_mass)-3.0*pole_mass*(c**2)
+
+        cart_accel = (2.0*(pole_length*pole_mass*(pole_velocity**2)*s+force-mu_c*cart_velocity)\
+            -3.0*pole_mass*gravity*c*s )/m
+
+        pole_accel = (-3.0*c*(pole_length/2.0*pole_mass*(pole_velocity**2)*s + force-mu_c*cart_velocity)+\
+            6.0*(cart_mass+pole_mass)/(pole_mass*pole_length)*\
+            (pole_mass*gravity*s - 2.0/pole_length*mu_p*pole_velocity) \
+            )/m
+
+        # Do the updates in this order, so that we get semi-implicit Euler that is simplectic rather than forward-Euler which is not.
+        cart_velocity += dt * cart_accel
+        pole_velocity += dt * pole_accel
+        d_theta = dt * pole_velocity
+        pole_angle    += d_theta
+        cart_location += dt * cart_velocity
+
+        # d_theta is tiny so its sin and cos are well approximated by their Taylor series
+        d_theta_sq = d_theta * d_theta
+        sd = d_theta * (1.0 - d_theta_sq/6.0)
+        cd = 1.0 - d_theta_sq/2.0 + d_theta_sq*d_theta_sq/24.0
+        s, c = s*cd + c*sd, c*cd - s*sd
+
+    return cart_location, cart_velocity, pole_angle, pole_velocity
+
 class CartPole:
     """Cart Pole environment. This implementation allows multiple poles,
     noisy action, and random starts. It has been checked repeatedly for
@@ -38,6 +108,10 @@ class CartPole:
     of round off errors that cause the oscillations to grow until it eventually falls.
     """
 
+    # limits beyond which an episode terminates
+    CART_LIMIT = 2.4
+    ANGLE_LIMIT = np.pi
+
     def __init__(self, visual=False):
         self.cart_location = 0.0
         self.cart_velocity = 0.0
@@ -88,29 +162,58 @@ class CartPole:
         force = self.max_force * np.tanh(action/self.max_force)
 
         # integrate forward the equations of motion using the Euler method
+        dt = (self.delta_time / float(self.sim_steps))
+        state = np.array([self.cart_location, self.cart_velocity, self.pole_angle, self.pole_velocity], dtype=float)
+        self.cart_location, self.cart_velocity, self.pole_angle, self.pole_velocity = \
+            _step_cartpole(state, float(force), self.sim_steps, dt, self.physical_params())
+
+        if self.visual:
+            self._render()
+
+    # the physical constants in the order _step_cartpole expects them
+    def physical_params(self):
+        return (self.cart_mass, self.pole_mass, self.pole_length, self.mu_c, self.mu_p, self.gravity)
+
+    # the same equations of motion applied to a batch of states at once, each column is updated as a vector
+    def performAction_batch(self, states, actions):
+        """
+        Parameters
+        ----------
+        states : np.ndarray
+            (N, 4) array of [cart_location, cart_velocity, pole_angle, pole_velocity]
+        actions : np.ndarray
+            (N,) array of actions, one per state
+
+        Returns
+        -------
+        np.ndarray
+            (N, 4) array of states after one action step, the CartPole's own state is left untouched
+        """
+        states = np.array(states, dtype=float)
+        force = self.max_force * np.tanh(np.asarray(actions, dtype=float)/self.max_force)
+        cart_location, cart_velocity, pole_angle, pole_velocity = states[:,0], states[:,1], states[:,2], states[:,3]
+        dt = (self.delta_time / float(self.sim_steps))
+
         for step in range(self.sim_steps):
-            s = np.sin(self.pole_angle)
-            c = np.cos(self.pole_angle)
+            s = np.sin(pole_angle)
+            c = np.cos(pole_angle)
             m = 4.0*(self.cart_mass+self.pole_mass)-3.0*self.pole_mass*(c**2)
-            
-            cart_accel = (2.0*(self.pole_length*self.pole_mass*(self.pole_velocity**2)*s+force-self.mu_c*self.cart_velocity)\
+
+            cart_accel = (2.0*(self.pole_length*self.pole_mass*(pole_velocity**2)*s+force-self.mu_c*cart_velocity)\
                 -3.0*self.pole_mass*self.gravity*c*s )/m
-            
-            pole_accel = (-3.0*c*(self.pole_length/2.0*self.pole_mass*(self.pole_velocity**2)*s + force-self.mu_c*self.cart_velocity)+\
+
+            pole_accel = (-3.0*c*(self.pole_length/2.0*self.pole_mass*(pole_velocity**2)*s + force-self.mu_c*cart_velocity)+\
                 6.0*(self.cart_mass+self.pole_mass)/(self.pole_mass*self.pole_length)*\
-                (self.pole_mass*self.gravity*s - 2.0/self.pole_length*self.mu_p*self.pole_velocity) \
+                (self.pole_mass*self.gravity*s - 2.0/self.pole_length*self.mu_p*pole_velocity) \
                 )/m
 
-            # Update state variables
-            dt = (self.delta_time / float(self.sim_steps))
-            # Do the updates in this order, so that we get semi-implicit Euler that is simplectic rather than forward-Euler which is not. 
-            self.cart_velocity += dt * cart_accel
-            self.pole_velocity += dt * pole_accel
-            self.pole_angle    += dt * self.pole_velocity
-            self.cart_location += dt * self.cart_velocity
+            # same semi-implicit update order as performAction
+            cart_velocity = cart_velocity + dt * cart_accel
+            pole_velocity = pole_velocity + dt * pole_accel
+            pole_angle    = pole_angle + dt * pole_velocity
+            cart_location = cart_location + dt * cart_velocity
 
-        if self.visual:
-            self._render()
+        return np.stack([cart_location, cart_velocity, pole_angle, pole_velocity], axis=1)
 
     # remapping as a member function
     def remap_angle(self):
@@ -125,11 +228,10 @@ class CartPole:
 
         Returns:
             A boolean, true indicating the end of an episode and false indicating the episode should continue.
-            False is returned if either the cart location or
+            True is returned if either the cart location or
             the pole angle is beyond the allowed range.
         """
-        return np.abs(self.cart_location) > self.state_range[0, 1] or \
-               (np.abs(self.pole_angle) > self.state_range[2, 1]).any()
+        return abs(self.cart_location) > self.CART_LIMIT or abs(self.pole_angle) > self.ANGLE_LIMIT
 
    # the following are graphics routines
     def drawPlot(self):
@@ -188,10 +290,9 @@ def move_cart(initial_x, steps=1, visual=False, display_plots=True, remap_angle=
         
     Returns
     -------
-    list 
-        x_history of state at discrete intervals
+    np.ndarray
+        state after the final step
     """
-    assert steps != 4, "Sorry, I don't like 4 steps"
     if noisy_dynamics: 
         try:
             kwargs['noise_function'] 
@@ -204,34 +305,34 @@ def move_cart(initial_x, steps=1, visual=False, display_plots=True, remap_angle=
     cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action = x_
     
 
-    for _ in range(steps):
+    x_history = np.empty((steps+1, 5))
+    x_history[0] = initial_x
+
+    for step in range(steps):
         if visual: cp.drawPlot()
         cp.performAction(action)
         if remap_angle: cp.remap_angle()
         if noisy_dynamics: 
             cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action = kwargs['noise_function']([cp.cart_location, cp.cart_velocity, cp.pole_angle, 
                                                                                                                     cp.pole_velocity, action], var=kwargs['var'])
-        try: 
-            x_history = np.vstack((x_history, np.array([cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action])))
-        except:
-            x_history = np.array((initial_x, [cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action]))
+        x_history[step+1] = cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action
         
     t = range(x_history.shape[0]) if steps > 1 else 1
     
     if display_plots and steps > 1:
         fig, axs = plt.subplots(1, 3, figsize=(20, 5))
         
-        axs[0].plot(t, [x[0] for x in x_history], label='cart_location')
-        axs[0].plot(t, [x[1] for x in x_history], label='cart_velocity')
-        axs[0].plot(t, [x[2] for x in x_history], label='pole_angle')
-        axs[0].plot(t, [x[3] for x in x_history], label='pole_velocity')
+        axs[0].plot(t, x_history[:,0], label='cart_location')
+        axs[0].plot(t, x_history[:,1], label='cart_velocity')
+        axs[0].plot(t, x_history[:,2], label='pole_angle')
+        axs[0].plot(t, x_history[:,3], label='pole_velocity')
         axs[0].legend()
         
-        axs[1].plot([x[0] for x in x_history], [x[1] for x in x_history])
+        axs[1].plot(x_history[:,0], x_history[:,1])
         axs[1].set_xlabel('cart_location')
         axs[1].set_ylabel('cart_velocity')
         
-        axs[2].plot([x[2] for x in x_history], [x[3] for x in x_history])
+        axs[2].plot(x_history[:,2], x_history[:,3])
         axs[2].set_xlabel('pole_angle')
         axs[2].set_ylabel('pole_velocity')
         
@@ -240,20 +341,47 @@ def move_cart(initial_x, steps=1, visual=False, display_plots=True, remap_angle=
     
     elif display_plots and steps == 1: print("You're trying to plot over {} steps, which is not plottable, pick a number greater than 1".format(steps))
         
-    if len(x_history) != 5: return x_history[-1]
-    else: return x_history
+    return x_history[-1]
 
-def generate_data(n, steps=1, train_proportion=0.8, remap_angle=False):
-    for i in range(n):
-        try:
-            x_ = np.array([np.random.normal(), np.random.uniform(-10, 10), np.random.uniform(-np.pi,np.pi), np.random.uniform(-15,15), np.random.uniform(-20,20)])
-            y_ = np.array(move_cart(x_, steps=steps, display_plots=False, remap_angle=remap_angle)) - x_
-            x = np.vstack((x, x_))
-            y = np.vstack((y, y_))
+# one CartPole shared by every step_once call
+_CP = CartPole()
 
-        except:
-            x = np.array([np.random.normal(), np.random.uniform(-10, 10), np.random.uniform(-np.pi,np.pi), np.random.uniform(-15,15), np.random.uniform(-20,20)])
-            y = np.array(move_cart(x, steps=steps, display_plots=False, remap_angle=remap_angle)) - x
+def step_once(x, remap_angle=False):
+    """
+    a single action step, the same as move_cart(x, steps=1, display_plots=False)
+    without creating a CartPole or any of move_cart's plotting and history overhead
+
+    Parameters
+    ----------
+    x : list-like
+        [cart_location, cart_velocity, pole_angle, pole_velocity, action]
+    remap_angle: bool
+        whether to remap angle to between pi -pi
+
+    Returns
+    -------
+    np.ndarray
+        state after the step, with the action unchanged
+    """
+    _CP.cart_location, _CP.cart_velocity, _CP.pole_angle, _CP.pole_velocity, action = x
+    _CP.performAction(action)
+    if remap_angle: _CP.remap_angle()
+    return np.array([_CP.cart_location, _CP.cart_velocity, _CP.pole_angle, _CP.pole_velocity, action])
+
+def generate_data(n, steps=1, train_proportion=0.8, remap_angle=False):
+    # all n initial states are sampled at once and stepped together as a batch
+    x = np.stack([np.random.normal(size=n), np.random.uniform(-10, 10, n), np.random.uniform(-np.pi, np.pi, n), 
+                  np.random.uniform(-15, 15, n), np.random.uniform(-20, 20, n)], axis=1)
+    
+    cp = CartPole()
+    x_t = x.copy()
+    for _ in range(steps):
+        x_t[:,:4] = cp.performAction_batch(x_t[:,:4], x_t[:,4])
+    # the dynamics are periodic in the pole angle so only the final angle needs remapping
+    if remap_angle: x_t[:,2] = _remap_angle_vec(x_t[:,2])
+    y = x_t - x
+    # the regression downstream only needs single precision
+    x, y = x.astype(np.float32), y.astype(np.float32)
         
     x_train, y_train, x_test, y_test = x[:int(n*train_proportion)], y[:int(n*train_proportion)], x[int(n*train_proportion):], y[int(n*train_proportion):]
 
@@ -275,21 +403,24 @@ def plot_y_contour_as_difference_in_x(initial_x, index_pair, range_x_pair, index
     index_1, index_2 = index_pair
     range_1, range_2 = range_x_pair
     
-    x_0_grid = np.zeros((len(range_1),len(range_2),5))
-    x_t_grid = np.zeros((len(range_1),len(range_2),5))
-    
-    for i,value_1 in enumerate(range_1):
-        for j, value_2 in enumerate(range_2):
-            x = initial_x.copy()
-            x[index_1] = value_1
-            x[index_2] = value_2
-            x_0_grid[i,j] = x
-            if dynamics == 'actual': x_t_grid[i,j] = np.array(move_cart(x, steps=1, display_plots=False, remap_angle=False))
-            elif dynamics == 'predicted':
-                assert model, 'no model given'
-                x_t_grid[i,j] = model(x, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) # TODO make this model.predict()
+    x_0_grid = np.empty((len(range_1),len(range_2),5))
+    x_0_grid[:,:] = initial_x
+    x_0_grid[:,:,index_1] = np.asarray(range_1)[:,None]
+    x_0_grid[:,:,index_2] = np.asarray(range_2)[None,:]
+    
+    if dynamics == 'actual': 
+        # the whole grid is flattened into one batch of states
+        x_flat = x_0_grid.reshape(-1, 5)
+        x_t_flat = x_flat.copy()
+        x_t_flat[:,:4] = CartPole().performAction_batch(x_flat[:,:4], x_flat[:,4])
+        x_t_grid = x_t_flat.reshape(x_0_grid.shape)
+    elif dynamics == 'predicted':
+        assert model, 'no model given'
+        x_t_grid = np.empty(x_0_grid.shape)
+        for i in range(len(range_1)):
+            for j in range(len(range_2)):
+                x_t_grid[i,j] = model(x_0_grid[i,j], kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) # TODO make this model.predict()
     y_grid = x_t_grid - x_0_grid
-    y_grid = np.moveaxis(y_grid, -1, 0)   
     
     fig, axs = plt.subplots(2, 2, figsize=(12, 9))
     
@@ -299,19 +430,19 @@ def plot_y_contour_as_difference_in_x(initial_x, index_pair, range_x_pair, index
     else:
         vmin = y_grid.min()
         vmax = y_grid.max()
-    axs[0,0].contourf(range_1, range_2, y_grid[0].T, vmin=vmin, vmax=vmax)
+    axs[0,0].contourf(range_1, range_2, y_grid[...,0].T, vmin=vmin, vmax=vmax)
     axs[0,0].set_title('cart_location')
     axs[0,0].set_xlabel('{} initial value'.format(index_to_variable[index_1]))
     axs[0,0].set_ylabel('{} initial value'.format(index_to_variable[index_2]))    
-    axs[0,1].contourf(range_1, range_2, y_grid[1].T, vmin=vmin, vmax=vmax)
+    axs[0,1].contourf(range_1, range_2, y_grid[...,1].T, vmin=vmin, vmax=vmax)
     axs[0,1].set_title('cart_velocity')
     axs[0,1].set_xlabel('{} initial value'.format(index_to_variable[index_1]))
     axs[0,1].set_ylabel('{} initial value'.format(index_to_variable[index_2]))
-    axs[1,0].contourf(range_1, range_2, y_grid[2].T, vmin=vmin, vmax=vmax)
+    axs[1,0].contourf(range_1, range_2, y_grid[...,2].T, vmin=vmin, vmax=vmax)
     axs[1,0].set_title('pole_angle')
     axs[1,0].set_xlabel('{} initial value'.format(index_to_variable[index_1]))
     axs[1,0].set_ylabel('{} initial value'.format(index_to_variable[index_2]))
-    axs[1,1].contourf(range_1, range_2, y_grid[3].T, vmin=vmin, vmax=vmax)
+    axs[1,1].contourf(range_1, range_2, y_grid[...,3].T, vmin=vmin, vmax=vmax)
     axs[1,1].set_title('pole_velocity')
     axs[1,1].set_xlabel('{} initial value'.format(index_to_variable[index_1]))
     axs[1,1].set_ylabel('{} initial value'.format(index_to_variable[index_2]))
@@ -329,50 +460,47 @@ def project_x_using_model(initial_x, model, steps, remap_angle=False, compound_p
     
     cp = CartPole()
     cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action = initial_x
-    pred_ = None
+    prediction_history = np.empty((steps+1, 5))
+    y_history = np.empty((steps+1, 5))
+    prediction_history[0] = initial_x
+    y_history[0] = initial_x
     
     for step in range(steps):
         x_ = np.array([cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action])
         cp.performAction(action)
         if remap_angle: cp.remap_angle()
         y_ = np.array([cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action])
-        if pred_ is not None: 
-            if compound_predictions:
-                pred_ = pred_ + model(pred_, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) #TODO change to model.predict
-            else:
-                pred_ = x_ + model(x_, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) #TODO change to model.predict
+        if compound_predictions and step > 0:
+            pred_ = pred_ + model(pred_, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) #TODO change to model.predict
+        else:
+            pred_ = x_ + model(x_, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma']) #TODO change to model.predict
           
-        try:
-            prediction_history = np.vstack((prediction_history, pred_))
-            y_history = np.vstack((y_history, y_))
-        except:
-            assert all(x_) == all(initial_x), '{}_______{}'.format(x_, initial_x)
-            pred_ = x_ + model(x_, kwargs['alpha'], kwargs['X_i_vals'], kwargs['sigma'])
-            prediction_history = np.vstack((x_, pred_))
-            y_history = np.vstack((x_, y_))
+        prediction_history[step+1] = pred_
+        y_history[step+1] = y_
         print('action in project_x_using_model step {} was {}'.format(step, action))
     
     return prediction_history, y_history
 
 def plot_prediction_vs_actual_over_time(prediction_history, y_history, title=None):
+    prediction_history, y_history = np.asarray(prediction_history), np.asarray(y_history)
     
     t = range(len(prediction_history))
     
     fig, axs = plt.subplots(2, 2, figsize=(12, 9))
-    axs[0,0].plot(t, [y[0] for y in y_history], label='actual values')
-    axs[0,0].plot(t, [pred[0] for pred in prediction_history], label='predicted values')
+    axs[0,0].plot(t, y_history[:,0], label='actual values')
+    axs[0,0].plot(t, prediction_history[:,0], label='predicted values')
     axs[0,0].set_ylabel('Y_cart_location')
     axs[0,0].set_xlabel('time_step')    
-    axs[0,1].plot(t, [y[1] for y in y_history], label='actual values')
-    axs[0,1].plot(t, [pred[1] for pred in prediction_history], label='predicted values')
+    axs[0,1].plot(t, y_history[:,1], label='actual values')
+    axs[0,1].plot(t, prediction_history[:,1], label='predicted values')
     axs[0,1].set_ylabel('Y_cart_velocity')
     axs[0,1].set_xlabel('time_step')    
-    axs[1,0].plot(t, [y[2] for y in y_history], label='actual values')
-    axs[1,0].plot(t, [pred[2] for pred in prediction_history], label='predicted values')
+    axs[1,0].plot(t, y_history[:,2], label='actual values')
+    axs[1,0].plot(t, prediction_history[:,2], label='predicted values')
     axs[1,0].set_ylabel('Y_pole_angle')
     axs[1,0].set_xlabel('time_step')
-    axs[1,1].plot(t, [y[3] for y in y_history], label='actual values')
-    axs[1,1].plot(t, [pred[3] for pred in prediction_history], label='predicted values')
+    axs[1,1].plot(t, y_history[:,3], label='actual values')
+    axs[1,1].plot(t, prediction_history[:,3], label='predicted values')
     axs[1,1].set_ylabel('Y_pole_velocity')
     axs[1,1].set_xlabel('time_step')
     axs[0,1].legend(loc='upper right')
@@ -401,20 +529,13 @@ def plot_y_scans(initial_x, index_to_variable, x_range_for_index, model=None, re
         
         range_x = x_range_for_index[index]
         
-        x = initial_x.copy()
-        y_results = []
-        x_0 = None
-        x_t = None
-
-        for i in range_x:
-            x[index] = i
-            x_t = np.array(move_cart(x, steps=1, display_plots=False, remap_angle=remap_angle))
-            try:
-                x_t_results = np.vstack((x_t_results, x_t))
-                x_0 = np.vstack((x_0, x))
-            except:
-                x_t_results = x_t
-                x_0 = x.copy()
+        x_0 = np.empty((len(range_x), 5))
+        x_t_results = np.empty((len(range_x), 5))
+
+        for i, value in enumerate(range_x):
+            x_0[i] = initial_x
+            x_0[i, index] = value
+            x_t_results[i] = step_once(x_0[i], remap_angle=remap_angle)
 
         if model: 
             try: 
@@ -423,17 +544,17 @@ def plot_y_scans(initial_x, index_to_variable, x_range_for_index, model=None, re
                 predictions = model.predict(x_0) #linear model
 
         y_results = x_t_results - x_0
-        if remap_angle: y_results[:,2] = np.array([_remap_angle(theta) for theta in y_results[:,2]])
+        if remap_angle: y_results[:,2] = _remap_angle_vec(y_results[:,2])
         
-        axs[int(round((index+1)/4,0)),index%2].plot(range_x, [y[0] for y in y_results], 'C0-', label='c_l')
-        axs[int(round((index+1)/4,0)),index%2].plot(range_x, [y[1] for y in y_results], 'C1-', label='c_v')
-        axs[int(round((index+1)/4,0)),index%2].plot(range_x, [y[2] for y in y_results], 'C2-', label='p_a')
-        axs[int(round((index+1)/4,0)),index%2].plot(range_x, [y[3] for y in y_results], 'C3-', label='p_v')
+        axs[int(round((index+1)/4,0)),index%2].plot(range_x, y_results[:,0], 'C0-', label='c_l')
+        axs[int(round((index+1)/4,0)),index%2].plot(range_x, y_results[:,1], 'C1-', label='c_v')
+        axs[int(round((index+1)/4,0)),index%2].plot(range_x, y_results[:,2], 'C2-', label='p_a')
+        axs[int(round((index+1)/4,0)),index%2].plot(range_x, y_results[:,3], 'C3-', label='p_v')
         if model:
-            axs[int(round((index+1)/4,0)),index%2].plot(range_x, [pred_[0] for pred_ in predictions], 'C0--', label='c_l_pred')
-            axs[int(round((index+1)/4,0)),index%2].plot(range_x, [pred_[1] for pred_ in predictions], 'C1--', label='c_v_pred')
-            axs[int(round((index+1)/4,0)),index%2].plot(range_x, [pred_[2] for pred_ in predictions], 'C2--', label='p_a_pred')
-            axs[int(round((index+1)/4,0)),index%2].plot(range_x, [pred_[3] for pred_ in predictions], 'C3--', label='p_v_pred')
+            axs[int(round((index+1)/4,0)),index%2].plot(range_x, predictions[:,0], 'C0--', label='c_l_pred')
+            axs[int(round((index+1)/4,0)),index%2].plot(range_x, predictions[:,1], 'C1--', label='c_v_pred')
+            axs[int(round((index+1)/4,0)),index%2].plot(range_x, predictions[:,2], 'C2--', label='p_a_pred')
+            axs[int(round((index+1)/4,0)),index%2].plot(range_x, predictions[:,3], 'C3--', label='p_v_pred')
         axs[int(round((index+1)/4,0)),index%2].set_ylabel('component of y values')
         axs[int(round((index+1)/4,0)),index%2].set_xlabel('{} initial values'.format(index_to_variable[index]))
         axs[int(round((index+1)/4,0)),index%2].legend()
@@ -443,35 +564,75 @@ def plot_y_scans(initial_x, index_to_variable, x_range_for_index, model=None, re
 
 def kernel(X, X_dash, sigma):
 
-    if type(X) == list: X = np.array(X)
-    if type(X_dash) == list: X_dash = np.array([X_dash])
+    X, X_dash = np.asarray(X, dtype=float), np.asarray(X_dash, dtype=float)
     
-    try:
-        squared_numerator = np.array([(X[i]-X_dash[i])**2 if i != 2  else (np.sin((X[i]-X_dash[i])/2))**2 for i in range(5)])
-    except:
-        print(X, X_dash, '<------------ fix this')
-    return np.exp(-np.sum(np.divide(squared_numerator, 2*np.square(sigma))))
+    squared_numerator = (X[:5]-X_dash[:5])**2
+    squared_numerator[2] = (np.sin((X[2]-X_dash[2])/2))**2
+    return np.exp(-np.dot(squared_numerator, inv_two_sigma_sq(sigma)))
 
-def generate_K(X, M, sigma, kernel=kernel):
-    if type(M) != list: M = np.array(M)
-        
-    for x_location in X:
-        K_row = np.array([kernel(x_location, RBF_x, sigma) for RBF_x in X[M]])
-        try:
-            KnM = np.vstack((KnM, K_row))
-        except:
-#             print('first row of K: {} <---------------------- this should only happen once'.format(K_row.shape))
-            KnM = K_row
+# 1/(2 sigma^2) for each of the 5 variables, so the kernel exponent is a multiply and sum with no divisions
+def inv_two_sigma_sq(sigma):
+    return np.ones(5) / (2.0 * np.square(sigma))
+
+def kernel_matrix(X, X_dash, sigma, inv_two_sigma_sq_=None):
+    """
+    the kernel between every row of X and every row of X_dash, computed in one broadcast
+
+    Parameters
+    ----------
+    inv_two_sigma_sq_ : np.ndarray, optional
+        inv_two_sigma_sq(sigma) if the caller has already computed it
+
+    Returns
+    -------
+    np.ndarray
+        (len(X), len(X_dash)) float32 matrix with entry [n, m] equal to kernel(X[n], X_dash[m], sigma)
+    """
+    # float32 is plenty for the regression and halves the memory traffic of the (N, M) matrix
+    if inv_two_sigma_sq_ is None: inv_two_sigma_sq_ = inv_two_sigma_sq(sigma)
+    diff_ = np.asarray(X, dtype=np.float32)[:,None,:] - np.asarray(X_dash, dtype=np.float32)[None,:,:]
+    diff_[...,2] = np.sin(diff_[...,2]/2)
+    return np.exp(-np.dot(diff_**2, np.asarray(inv_two_sigma_sq_, dtype=np.float32)))
+
+def generate_K_vec(X, M_idx, sigma, inv_two_sigma_sq_=None):
+    return kernel_matrix(X, X[M_idx], sigma, inv_two_sigma_sq_)
+
+def generate_K(X, M, sigma, kernel=None):
+    M = np.asarray(M)
+    if kernel is None: return generate_K_vec(X, M, sigma)
+    
+    # a custom kernel can only be evaluated one pair at a time
+    KnM = np.empty((len(X), len(M)), dtype=np.float32)
+    for i, x_location in enumerate(X):
+        KnM[i] = [kernel(x_location, RBF_x, sigma) for RBF_x in X[M]]
             
     return KnM
 
-def train_alpha(x_train, y_train, no_RBC, sigma, n, train_proportion, kernel=kernel, lam=0.00001):
+def train_alpha(x_train, y_train, no_RBC, sigma, n, train_proportion, kernel=None, lam=0.00001):
     
-    M_vals = np.random.randint(0, high=n*train_proportion, size=no_RBC)
+    # centres are drawn without replacement, a repeated centre adds nothing to the fit but makes A singular
+    M_vals = np.random.choice(int(n*train_proportion), size=no_RBC, replace=False)
     X_i_vals = x_train[M_vals]
-    KnM_ = generate_K(x_train, M_vals, sigma, kernel)
-    KMM_ = generate_K(X_i_vals, [i for i in range(M_vals.size)], sigma, kernel)
-    alpha = np.linalg.lstsq(np.matmul(KnM_.T, KnM_) + lam*KMM_, np.matmul(KnM_.T, y_train))[0]
+    if kernel is None:
+        inv_two_sigma_sq_ = inv_two_sigma_sq(sigma)
+        KnM_ = generate_K_vec(x_train, M_vals, sigma, inv_two_sigma_sq_)
+        KMM_ = generate_K_vec(X_i_vals, np.arange(M_vals.size), sigma, inv_two_sigma_sq_)
+    else:
+        KnM_ = generate_K(x_train, M_vals, sigma, kernel)
+        KMM_ = generate_K(X_i_vals, np.arange(M_vals.size), sigma, kernel)
+    # the normal equations are formed in float64, in float32 lam*KMM falls below the resolution of KnM^T KnM
+    KnM_, KMM_ = KnM_.astype(np.float64), KMM_.astype(np.float64)
+    # KnM_ is C-contiguous so KnM_.T is already in the Fortran order BLAS wants, nothing is copied.
+    # syrk only fills the lower triangle of KnM^T KnM, which is all cho_factor(lower=True) reads
+    syrk, gemm = get_blas_funcs(('syrk', 'gemm'), (KnM_,))
+    A = syrk(1.0, KnM_.T, lower=1) + lam*KMM_
+    b = gemm(1.0, KnM_.T, np.asarray(y_train, dtype=np.float64))
+    # with distinct centres A is symmetric positive definite so Cholesky is enough, lstsq is only needed when it is too ill-conditioned
+    try:
+        alpha = scipy.linalg.cho_solve(scipy.linalg.cho_factor(A, lower=True), b)
+    except np.linalg.LinAlgError:
+        A = np.tril(A) + np.tril(A, -1).T
+        alpha = np.linalg.lstsq(A, b)[0]
 
 #     alpha = np.linalg.lstsq(np.matmul(KnM_.T, KnM_), np.matmul(KnM_.T, y_train))[0]
 #     alpha = np.matmul(np.linalg.pinv(KnM_), y_train).T
@@ -479,68 +640,62 @@ def train_alpha(x_train, y_train, no_RBC, sigma, n, train_proportion, kernel=ker
     
     return alpha, X_i_vals
 
-def predict(x_test, alpha, X_i_vals, sigma, kernel=kernel):
-    KnM_test= [None, None]
-    for X_i in X_i_vals:
-        if x_test.size > 4:
-            assert x_test.size % 5 == 0, 'x_test.size: ' + str(x_test.size)
-            
-            if x_test.ndim == 1:
-                KnM_test_row = kernel(X_i, x_test, sigma=sigma)
-            else:
-                KnM_test_row = np.array([kernel(X_i, x_test_, sigma=sigma) for x_test_ in x_test])
-            
-        elif x_test.size == 4:
-            if x_test.ndim > 1: x_test = x_test[0]
-            KnM_test_row = kernel(X_i, x_test, sigma=sigma)
-        try:
-            KnM_test = np.vstack((KnM_test, KnM_test_row))
-        except:
-            KnM_test = KnM_test_row
-    predictions = np.matmul(KnM_test.T, alpha)
+def predict(x_test, alpha, X_i_vals, sigma, kernel=None):
+    # a single state is treated as a batch of one, so predictions always come back as (N, 5)
+    x_test = np.atleast_2d(x_test)
+    assert x_test.shape[-1] == 5, 'x_test.shape: ' + str(x_test.shape)
+    
+    if kernel is None:
+        # every test point against every centre in one broadcast
+        KnM_test = kernel_matrix(x_test, X_i_vals, sigma)
+    else:
+        KnM_test = np.empty((len(x_test), len(X_i_vals)), dtype=np.float32)
+        for i, x_test_ in enumerate(x_test):
+            KnM_test[i] = [kernel(X_i, x_test_, sigma=sigma) for X_i in X_i_vals]
+    predictions = np.matmul(KnM_test, alpha)
     
     return predictions
 
 def display_RMSE(predictions, y_test):
     targets = y_test            
-    return [np.sqrt(np.mean((predictions[:,j]-targets[:,j])**2)) for j in range(4)] 
+    return np.sqrt(np.mean((predictions[:,:4]-targets[:,:4])**2, axis=0))
 
 def project_loss(initial_x, steps=1):
     cp = CartPole()
     cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action = initial_x
     loss_history = [loss(initial_x[:-1])]
-    y_history = np.array([initial_x])
+    y_history = np.empty((steps+1, 5))
+    y_history[0] = initial_x
     
-    for _ in range(steps):
+    for step in range(steps):
         cp.performAction(action)
         cp.remap_angle()
         y_ = np.array([cp.cart_location, cp.cart_velocity, cp.pole_angle, cp.pole_velocity, action])
         loss_ = loss(y_[:-1])
         loss_history.append(loss_)
-        y_history = np.vstack((y_history, y_))
+        y_history[step+1] = y_
         
     return np.array(loss_history), y_history
 
 def plot_loss_contours(initial_x, initial_p, index_pair, range_p_pair):
     index_1, index_2 = index_pair
     range_1, range_2 = range_p_pair
-    loss_grid = np.zeros((len(range_1),len(range_2)))
+    initial_x = np.asarray(initial_x, dtype=float)
     
     fig = plt.figure()
     ax = fig.add_subplot(111)
     
-    for i,value_1 in enumerate(range_1):
-        for j, value_2 in enumerate(range_2):
-            x_ = initial_x.copy()
-            p_ = initial_p.copy()
-            p_[index_1] = value_1
-            p_[index_2] = value_2
-            x_[-1] = 20 * np.tanh(np.dot(x_[:-1],p_))
-            y_ = np.array(move_cart(x_, steps=1, display_plots=False, remap_angle=False))
-            loss_y = loss(y_)
-            loss_x = loss(initial_x.copy())
-#             print(loss_y,loss_x,y_,x_)
-            loss_grid[i,j] = loss_y - loss_x
+    # every p on the grid gives one action, and all of them are stepped from initial_x as a single batch
+    p_grid = np.empty((len(range_1),len(range_2),4))
+    p_grid[:,:] = initial_p
+    p_grid[:,:,index_1] = np.asarray(range_1)[:,None]
+    p_grid[:,:,index_2] = np.asarray(range_2)[None,:]
+    action_grid = 20 * np.tanh(np.matmul(p_grid, initial_x[:-1]))
+    
+    x_batch = np.broadcast_to(initial_x[:-1], (action_grid.size, 4))
+    y_batch = CartPole().performAction_batch(x_batch, action_grid.ravel())
+    loss_x = loss(initial_x[:-1])
+    loss_grid = (loss(y_batch) - loss_x).reshape(action_grid.shape)
                 
     plt.contourf(range_1, range_2, loss_grid.T)
     cs = ax.contourf(range_1, range_2, loss_grid.T)
@@ -554,19 +709,17 @@ def policy_exponent(X, X_i, W):
     if X.size == 5: X = X[:-1]
     if X_i.size == 5: X_i = X_i[:-1]
     diff_ = X - X_i    
-    try:
-        power_ = -0.5 * np.matmul(np.matmul(diff_, W), diff_.T)
-        # print(diff_,power_)
-    except: # this solves issue of scipy.optimize.minimize needing 1D array
-        W = np.reshape(W, (-1, 4))
-        power_ = -0.5 * np.matmul(np.matmul(diff_, W), diff_.T)
-        # TODO assert W is symmetric
-    # print('#####',np.matmul(diff_.T, W), diff_)
+    W = np.reshape(W, (4, 4)) # scipy.optimize.minimize hands W over as a 1D array
+    # TODO assert W is symmetric
+    power_ = -0.5 * np.matmul(np.matmul(diff_, W), diff_.T)
     return np.exp(power_)
 
 def non_linear_policy(w_i, X, X_i_vals, W):
-    # print('--',np.sum(np.array([w_i[i] * policy_exponent(X, X_i_vals[i], W) for i in range(int(w_i.size/4))])))
-    return np.sum(np.array([w_i[i] * policy_exponent(X, X_i_vals[i], W) for i in range(int(w_i.size))])) #TODO vectorise this 
+    # the exponents for every centre come out of one einsum instead of a policy_exponent call each
+    w_i = np.asarray(w_i)
+    diff_ = np.asarray(X)[:4] - np.asarray(X_i_vals)[:w_i.size, :4]
+    power_ = -0.5 * np.einsum('ni,ij,nj->n', diff_, np.reshape(W, (4, 4)), diff_)
+    return np.sum(w_i * np.exp(power_))
 
 def _loss(state, sig_):
     # alpha = np.array([5,2,0.7,3])
@@ -574,48 +727,126 @@ def _loss(state, sig_):
 
     # return sum([1 - 1/(np.exp((state[i]/alpha[i])**2)) for i in range(4)])
    
-    if type(state) == list: state = np.array(state).flatten()
-    state = state[:4]
+    state = np.asarray(state)
+    # an (N, >=4) batch of states gives one loss per row
+    scaled_state = state[...,:4] * (1.0/np.asarray(sig_))
     # print(state)
-    loss_ = 1-np.exp(-np.dot(state/sig_,state/sig_)/(2.0))
+    loss_ = 1-np.exp(-np.sum(scaled_state*scaled_state, axis=-1)/(2.0))
     # print(np.round(loss_,5))
     return loss_
 
+@njit(cache=True, fastmath=True)
+def rollout_loss(x_0, p_or_w_i, W, X_i_vals, inv_sig_array, is_linear, sim_steps, dt, max_force, params):
+    """
+    compiled rollout of the real dynamics under a linear or non linear policy,
+    the loop inside loss_after_steps when no model is used for the rollout
+
+    Parameters
+    ----------
+    x_0 : np.ndarray
+        initial [cart_location, cart_velocity, pole_angle, pole_velocity, action]
+    p_or_w_i : np.ndarray
+        p for the linear policy, or the w_i weights of the non linear policy
+    W : np.ndarray
+        (4, 4) matrix of the non linear policy, unused for the linear policy
+    X_i_vals : np.ndarray
+        (N, >=4) centres of the non linear policy, unused for the linear policy
+    inv_sig_array : np.ndarray
+        (steps, 4) reciprocal of the loss function's sigma at each step
+    is_linear : bool
+        whether to use the linear policy
+    sim_steps, dt, max_force, params :
+        integration settings of the CartPole, see _step_cartpole
+
+    Returns
+    -------
+    float
+        loss summed over every step of the rollout
+    """
+    state = x_0[:4].copy()
+    cumulative_loss = 0.0
+
+    for step in range(inv_sig_array.shape[0]):
+        if is_linear:
+            action = 0.0
+            for j in range(4):
+                action += p_or_w_i[j] * state[j]
+            action = 20.0 * math.tanh(action/20.0)
+        else:
+            action = 0.0
+            for i in range(p_or_w_i.shape[0]):
+                power = 0.0
+                for j in range(4):
+                    for k in range(4):
+                        power += (state[j]-X_i_vals[i,j]) * W[j,k] * (state[k]-X_i_vals[i,k])
+                action += p_or_w_i[i] * math.exp(-0.5*power)
+
+        force = max_force * math.tanh(action/max_force)
+        state[0], state[1], state[2], state[3] = _step_cartpole(state, force, sim_steps, dt, params)
+        # the loss and the policy both read the angle directly, so it has to be remapped every step
+        if state[2] < -math.pi or state[2] > math.pi:
+            state[2] = (state[2] + math.pi) % (2.0*math.pi) - math.pi
+
+        scaled_square = 0.0
+        for j in range(4):
+            scaled_square += (state[j]*inv_sig_array[step,j])**2
+        cumulative_loss += 1.0 - math.exp(-scaled_square/2.0)
+
+    return cumulative_loss
+
 def loss_after_steps(x_row, kwargs_, steps=30):
     cumulative_loss = 0
-    if type(x_row) == list: x_row = np.array(x_row)
-    x_ = x_row.copy().flatten()
+    x_ = np.asarray(x_row, dtype=float).flatten()
     x_[2] = remap_angle(x_[2])
     if kwargs_['linear']:
         sig_list = kwargs_['sig']*steps
     else:
         sig_list = np.linspace(kwargs_['sig_start'], kwargs_['sig_end'], steps)
     
+    if not kwargs_['linear'] and kwargs_['parameter_to_be_optimised'] == 'entire_array':
+        ris = -kwargs_['no_RBC']*4 #radial_index_start
+        w_i = kwargs_[kwargs_['parameter_to_be_optimised']][:ris-16]
+        flat_W = kwargs_[kwargs_['parameter_to_be_optimised']][ris-16:ris]
+        X_i_vals = kwargs_[kwargs_['parameter_to_be_optimised']][ris:].reshape(-1,4)
+        W_ = flat_W.reshape(4,4)
+        W = np.matmul(W_.T,W_)
+        kwargs_['w_i'] = w_i
+        kwargs_['W'] = W
+        kwargs_['X_i_vals'] = X_i_vals
+    
+    if not kwargs_['model_predictive_control']:
+        # the whole rollout runs inside one compiled function
+        sig_array = np.asarray(sig_list, dtype=float).reshape(len(sig_list), -1)
+        inv_sig_array = 1.0 / np.broadcast_to(sig_array, (len(sig_list), 4))
+        if kwargs_['linear']:
+            p_or_w_i, W, X_i_vals = np.asarray(kwargs_['p'], dtype=float), np.zeros((4,4)), np.zeros((0,4))
+            # likewise rollout_loss reads exactly 4 entries of p without checking
+            if p_or_w_i.size != 4:
+                raise ValueError('p has {} entries but the linear policy needs 4'.format(p_or_w_i.size))
+        else:
+            p_or_w_i = np.asarray(kwargs_['w_i'], dtype=float)
+            W = np.asarray(kwargs_['W'], dtype=float).reshape(4,4)
+            X_i_vals = np.asarray(kwargs_['X_i_vals'], dtype=float)
+            # rollout_loss is compiled without bounds checking, so a short X_i_vals has to be caught here
+            if X_i_vals.ndim != 2 or X_i_vals.shape[0] < p_or_w_i.size or X_i_vals.shape[1] < 4:
+                raise IndexError('X_i_vals of shape {} has too few centres for {} weights'.format(X_i_vals.shape, p_or_w_i.size))
+        cp = CartPole()
+        cumulative_loss = rollout_loss(x_, p_or_w_i, W, X_i_vals, inv_sig_array, bool(kwargs_['linear']), 
+                                       cp.sim_steps, cp.delta_time/float(cp.sim_steps), cp.max_force, cp.physical_params())
+        print('cumulative_loss: \t', np.round(cumulative_loss,4))
+        return cumulative_loss
+    
+    # model predictive control, the rollout is predicted by the model one step at a time
     for sig_ in sig_list: #for step in range(steps)
         if kwargs_['linear']: action_ = 20 * np.tanh(np.dot(kwargs_['p'], np.array(x_).flatten()[:-1])/20)
-        
-        else: 
-            if kwargs_['parameter_to_be_optimised'] == 'entire_array':
-                ris = -kwargs_['no_RBC']*4 #radial_index_start
-                w_i = kwargs_[kwargs_['parameter_to_be_optimised']][:ris-16]
-                flat_W = kwargs_[kwargs_['parameter_to_be_optimised']][ris-16:ris]
-                X_i_vals = kwargs_[kwargs_['parameter_to_be_optimised']][ris:]
-                W_ = flat_W.reshape(4,4)
-                W = np.matmul(W_.T,W_)
-                kwargs_['w_i'] = w_i
-                kwargs_['W'] = W
-                kwargs_['X_i_vals'] = X_i_vals
-            action_ = non_linear_policy(kwargs_['w_i'], x_[:-1], kwargs_['X_i_vals'], kwargs_['W']) 
+        else: action_ = non_linear_policy(kwargs_['w_i'], x_[:-1], kwargs_['X_i_vals'], kwargs_['W']) 
         x_[-1] = action_
 
-        if kwargs_['model_predictive_control']:
-            y_ = kwargs_['rollout_prediction_model'](x_, kwargs_['rollout_prediction_model_attr']['alpha'], 
-                                                        kwargs_['rollout_prediction_model_attr']['X_i_vals'], 
-                                                        kwargs_['rollout_prediction_model_attr']['sigma']) 
-            y_ = np.array(y_)
-            #change to model.predict
-        else:
-            y_ = np.array(move_cart(x_, steps=1, display_plots=False, remap_angle=True)) 
+        y_ = kwargs_['rollout_prediction_model'](x_, kwargs_['rollout_prediction_model_attr']['alpha'], 
+                                                    kwargs_['rollout_prediction_model_attr']['X_i_vals'], 
+                                                    kwargs_['rollout_prediction_model_attr']['sigma']) 
+        y_ = np.array(y_)
+        #change to model.predict
         
         # if kwargs_['parameter_to_be_optimised'] == 'alpha':
         cumulative_loss += loss(y_.flatten(), sig_) 
@@ -648,7 +879,7 @@ def training_loss(array_for_optimisation, x_train, kwargs_):
 
 
 def add_noise(data_array, var=0.01):#, lam=0.05 , var=[10,20,2*np.pi,30,40]):
-    if type(data_array) == list: data_array = np.array(data_array)  
+    data_array = np.asarray(data_array)
 #     if type(var) == list: var = np.array(var)  
 #     if var is None: var = (np.std(data_array, axis=0)*lam)**2
     if data_array.shape == data_array.size: data_array = np.expand_dims(data_array,0) 
@@ -668,8 +899,8 @@ def add_noise(data_array, var=0.01):#, lam=0.05 , var=[10,20,2*np.pi,30,40]):
 def plot_predictions_vs_actual(predictions, actual, index_to_variable):
     fig,axs = plt.subplots(2,2,figsize=(12,9))
     for j in range(4):
-        ul = max(max(predictions[:,j]), max(actual[:,j]))
-        ll = min(min(predictions[:,j]), min(actual[:,j]))
+        ul = max(predictions[:,j].max(), actual[:,j].max())
+        ll = min(predictions[:,j].min(), actual[:,j].min())
         axs[int(round((j+1)/4,0)),j%2].scatter(predictions[:,j], actual[:,j])
         axs[int(round((j+1)/4,0)),j%2].plot([ll,ul],[ll,ul], color='g')
         axs[int(round((j+1)/4,0)),j%2].set_title(index_to_variable[j])